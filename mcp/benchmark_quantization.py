@@ -0,0 +1,229 @@
+"""
+Recall-vs-memory benchmark for the chunk index storage options.
+
+Loads every chunk vector from Weaviate (best ingested at full dimensions), embeds a
+fixed query set at the same size and compares each storage option against exact full-precision
+search:
+
+  - truncated Matryoshka dimensions (same as the OpenAI `dimensions` parameter:
+    truncate, then re-normalize)
+  - scalar (sq), product (pq) and binary (bq) quantization
+  - with and without full-precision rescoring of the top candidates
+
+Usage:
+  python benchmark_quantization.py --queries benchmark_queries.txt --top-k 5 --output report.json
+"""
+import os
+import json
+import argparse
+import logging
+from typing import List, Dict, Any
+
+import numpy as np
+
+from langchain_openai import OpenAIEmbeddings
+
+from vector_storage import (
+    get_weaviate_client,
+    WEAVIATE_CLASS,
+    PQ_SEGMENTS,
+    PQ_CENTROIDS,
+    RESCORE_MULTIPLIER,
+    pq_segments,
+    pq_training_limit,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------------- Configuration -------------------------
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+BENCHMARK_DIMENSIONS = [int(d) for d in os.getenv("BENCHMARK_DIMENSIONS", "1536,1024,512,256").split(",")]
+KMEANS_ITERATIONS = 10
+SEED = 42
+
+
+# ------------------------- Data loading -------------------------
+def load_chunk_vectors() -> np.ndarray:
+    client = get_weaviate_client()
+    try:
+        collection = client.collections.use(WEAVIATE_CLASS)
+        vectors = []
+        for obj in collection.iterator(include_vector=True):
+            vector = obj.vector
+            if isinstance(vector, dict):
+                vector = vector.get("default")
+            if vector:
+                vectors.append(vector)
+    finally:
+        client.close()
+    logger.info("Loaded %d chunk vectors from %s", len(vectors), WEAVIATE_CLASS)
+    return np.asarray(vectors, dtype=np.float32)
+
+def load_queries(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def embed_queries(queries: List[str], dimensions: int) -> np.ndarray:
+    """Embed at the size of the stored chunk vectors (EMBEDDING_DIMENSIONS at ingestion)."""
+    embedder = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, dimensions=dimensions, api_key=OPENAI_API_KEY)
+    return np.asarray(embedder.embed_documents(queries), dtype=np.float32)
+
+
+# ------------------------- Helpers -------------------------
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Matryoshka truncation: keep the first `dims` components and re-normalize."""
+    cut = vectors[:, :dims]
+    norms = np.linalg.norm(cut, axis=1, keepdims=True)
+    return cut / np.where(norms == 0, 1, norms)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first."""
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = [len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]
+    return float(np.mean(hits))
+
+def rescore(candidates: np.ndarray, queries: np.ndarray, docs: np.ndarray, k: int) -> np.ndarray:
+    """Re-rank approximate candidates by exact cosine similarity."""
+    exact = np.einsum("qd,qcd->qc", queries, docs[candidates])
+    order = np.argsort(-exact, axis=1)[:, :k]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+# ------------------------- Quantizers -------------------------
+# Each returns (approximate scores [queries x docs], bytes per stored vector)
+
+def score_float32(queries: np.ndarray, docs: np.ndarray):
+    return queries @ docs.T, docs.shape[1] * 4
+
+def score_sq(queries: np.ndarray, docs: np.ndarray):
+    """8-bit scalar quantization over the global value range."""
+    lo, hi = float(docs.min()), float(docs.max())
+    step = (hi - lo) / 255 or 1.0
+    codes = np.round((docs - lo) / step).astype(np.uint8)
+    return queries @ (codes.astype(np.float32) * step + lo).T, docs.shape[1]
+
+def score_bq(queries: np.ndarray, docs: np.ndarray):
+    """1 bit per dimension, compared by Hamming distance."""
+    doc_bits = np.where(docs > 0, 1.0, -1.0).astype(np.float32)
+    query_bits = np.where(queries > 0, 1.0, -1.0).astype(np.float32)
+    # For +/-1 vectors: dot = dims - 2 * hamming, so ranking by dot == ranking by -hamming
+    return query_bits @ doc_bits.T, int(np.ceil(docs.shape[1] / 8))
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # ||x - c||^2 without the constant ||x||^2 term
+    return ((centroids ** 2).sum(axis=1)[None, :] - 2 * data @ centroids.T).argmin(axis=1)
+
+def _kmeans(data: np.ndarray, k: int) -> np.ndarray:
+    rng = np.random.default_rng(SEED)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _nearest(data, centroids)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=col, minlength=k) for col in data.T], axis=1)
+        filled = counts > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+def score_pq(queries: np.ndarray, docs: np.ndarray):
+    """
+    Product quantization with asymmetric distance (one byte per segment), using
+    the segment count and training limit the ingestion service configures.
+    """
+    dims = docs.shape[1]
+    segments = pq_segments(dims)
+    if PQ_SEGMENTS and segments != PQ_SEGMENTS:
+        logger.warning("PQ_SEGMENTS=%d does not divide %d dimensions; using Weaviate's default %d",
+                       PQ_SEGMENTS, dims, segments)
+    rng = np.random.default_rng(SEED)
+    sample = rng.choice(len(docs), min(len(docs), pq_training_limit()), replace=False)
+    scores = np.zeros((len(queries), len(docs)), dtype=np.float32)
+    for q_seg, d_seg in zip(np.array_split(queries, segments, axis=1),
+                            np.array_split(docs, segments, axis=1)):
+        centroids = _kmeans(d_seg[sample], PQ_CENTROIDS)
+        codes = _nearest(d_seg, centroids)
+        scores += (q_seg @ centroids.T)[:, codes]
+    return scores, segments
+
+QUANTIZERS = {
+    "none": score_float32,
+    "sq": score_sq,
+    "pq": score_pq,
+    "bq": score_bq,
+}
+
+
+# ------------------------- Benchmark -------------------------
+def run_benchmark(docs: np.ndarray, queries: np.ndarray, k: int) -> List[Dict[str, Any]]:
+    full_dims = docs.shape[1]
+    truth = top_k(queries @ docs.T, k)
+    candidates_k = min(k * RESCORE_MULTIPLIER, len(docs))
+
+    report = []
+    for dims in BENCHMARK_DIMENSIONS:
+        if dims > full_dims:
+            logger.warning("Skipping %d dimensions: the index only stores %d", dims, full_dims)
+            continue
+        d = truncate(docs, dims)
+        q = truncate(queries, dims)
+        for name, scorer in QUANTIZERS.items():
+            scores, bytes_per_vector = scorer(q, d)
+            approx = top_k(scores, k)
+            rescored = rescore(top_k(scores, candidates_k), q, d, k)
+            row = {
+                "dimensions": dims,
+                "quantization": name,
+                "bytes_per_vector": bytes_per_vector,
+                "index_mb": round(bytes_per_vector * len(docs) / 1024 ** 2, 3),
+                "compression": round(full_dims * 4 / bytes_per_vector, 1),
+                f"recall@{k}": round(recall(approx, truth), 4),
+                f"recall@{k}_rescored": round(recall(rescored, truth), 4),
+            }
+            report.append(row)
+    return report
+
+def print_report(report: List[Dict[str, Any]], k: int):
+    header = f"{'dims':>5} {'quant':>5} {'bytes/vec':>9} {'index MB':>9} {'x smaller':>9} {'recall':>7} {'rescored':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in report:
+        print(
+            f"{r['dimensions']:>5} {r['quantization']:>5} {r['bytes_per_vector']:>9} "
+            f"{r['index_mb']:>9} {r['compression']:>9} "
+            f"{r[f'recall@{k}']:>7.4f} {r[f'recall@{k}_rescored']:>8.4f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs memory for chunk index storage options")
+    parser.add_argument("--queries", default=os.path.join(os.path.dirname(__file__), "benchmark_queries.txt"))
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    docs = load_chunk_vectors()
+    if len(docs) == 0:
+        raise SystemExit(f"No vectors found in {WEAVIATE_CLASS}; run the ingestion first")
+    queries = embed_queries(load_queries(args.queries), docs.shape[1])
+    if queries.shape[1] != docs.shape[1]:
+        raise SystemExit(
+            f"Query vectors have {queries.shape[1]} dimensions but the index stores {docs.shape[1]}; "
+            "check OPENAI_EMBEDDING_MODEL matches the model used at ingestion"
+        )
+
+    report = run_benchmark(docs, queries, args.top_k)
+    print_report(report, args.top_k)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"chunks": len(docs), "queries": len(queries), "top_k": args.top_k, "results": report}, f, indent=2)
+        logger.info("Report written to %s", args.output)
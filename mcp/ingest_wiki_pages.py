@@ -17,6 +17,15 @@ from weaviate import WeaviateClient, auth
 from weaviate.connect import ConnectionParams
 import weaviate.classes as wvc
 
+# Index storage settings shared with the MCP server
+from vector_storage import (
+    EMBEDDING_DIMENSIONS,
+    VECTOR_QUANTIZATION,
+    PQ_SEGMENTS,
+    QUANTIZATION_TRAINING_LIMIT,
+    QUANTIZATION_RESCORE_LIMIT,
+)
+
 # FastAPI for microservice
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
@@ -43,6 +52,8 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "64"))
 BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
 
 WEAVIATE_CLASS = os.getenv("WEAVIATE_CLASS", "DocumentChunk")
+# Seconds to wait for Weaviate to report the index as compressed after ingestion
+QUANTIZATION_WAIT_SECONDS = int(os.getenv("QUANTIZATION_WAIT_SECONDS", "60"))
 # WEAVIATE_CLASS = "DocumentChunk"
 
 # ------------------------- Requests session -------------------------
@@ -210,7 +221,11 @@ def embed_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if OPENAI_API_KEY is None:
         raise RuntimeError("OPENAI_API_KEY is not set")
 
-    embedder = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model=EMBEDDING_MODEL_NAME)
+    embedder = OpenAIEmbeddings(
+        openai_api_key=OPENAI_API_KEY,
+        model=EMBEDDING_MODEL_NAME,
+        dimensions=EMBEDDING_DIMENSIONS,
+    )
     texts = [c["content"] for c in chunks]
     vectors: List[List[float]] = []
 
@@ -273,7 +288,65 @@ def _connect_weaviate() -> WeaviateClient:
         
     return client
 
-def _ensure_weaviate_schema(client: WeaviateClient):
+def _vector_index_config():
+    """
+    Builds the HNSW index config used when the collection is created.
+    Only BQ is set here: it needs no training. PQ and SQ are trained on the
+    ingested vectors and enabled afterwards by `_enable_trained_quantizer`.
+    """
+    if VECTOR_QUANTIZATION != "bq":
+        return None
+    logger.info("Using bq vector quantization")
+    return wvc.config.Configure.VectorIndex.hnsw(
+        quantizer=wvc.config.Configure.VectorIndex.Quantizer.bq(rescore_limit=QUANTIZATION_RESCORE_LIMIT)
+    )
+
+def _enable_trained_quantizer(collection) -> None:
+    """
+    Enables PQ/SQ on a populated collection. Weaviate then trains the quantizer
+    on the existing vectors (up to the training limit) and compresses the index,
+    without needing ASYNC_INDEXING or waiting for `training_limit` new objects.
+    """
+    quantizer = wvc.config.Reconfigure.VectorIndex.Quantizer
+    if VECTOR_QUANTIZATION == "pq":
+        q = quantizer.pq(segments=PQ_SEGMENTS, training_limit=QUANTIZATION_TRAINING_LIMIT)
+    else:  # "sq"
+        q = quantizer.sq(rescore_limit=QUANTIZATION_RESCORE_LIMIT, training_limit=QUANTIZATION_TRAINING_LIMIT)
+    logger.info("Enabling %s vector quantization on %s", VECTOR_QUANTIZATION, WEAVIATE_CLASS)
+    collection.config.update(
+        vector_config=wvc.config.Reconfigure.Vectors.update(
+            name="default",
+            vector_index_config=wvc.config.Reconfigure.VectorIndex.hnsw(quantizer=q),
+        )
+    )
+
+def _log_compression_status(client: WeaviateClient) -> None:
+    """
+    Logs whether Weaviate actually compressed every shard of the collection.
+    """
+    deadline = time.monotonic() + QUANTIZATION_WAIT_SECONDS
+    while True:
+        shards = [
+            shard
+            for node in client.cluster.nodes(collection=WEAVIATE_CLASS, output="verbose")
+            for shard in (node.shards or [])
+        ]
+        if shards and all(shard.compressed for shard in shards):
+            logger.info("Weaviate collection %s is compressed (%s)", WEAVIATE_CLASS, VECTOR_QUANTIZATION)
+            return
+        if time.monotonic() >= deadline:
+            logger.warning(
+                "Weaviate collection %s is NOT compressed after %ds (%d/%d shards); "
+                "the index still uses full-precision vectors in memory",
+                WEAVIATE_CLASS,
+                QUANTIZATION_WAIT_SECONDS,
+                sum(1 for shard in shards if shard.compressed),
+                len(shards),
+            )
+            return
+        time.sleep(2)
+
+def _ensure_weaviate_schema(client: WeaviateClient, vector_index_config=None):
     # existing_collection_names = list(client.collections.list_all(simple=False).keys())
     if client.collections.exists(WEAVIATE_CLASS):
         logger.debug("Weaviate collection %s already exists", WEAVIATE_CLASS)
@@ -294,7 +367,9 @@ def _ensure_weaviate_schema(client: WeaviateClient):
         wvc.config.Property(name="last_modified", data_type=wvc.config.DataType.TEXT),
         wvc.config.Property(name="chunk_index", data_type=wvc.config.DataType.INT),
         ]
-    vector_cfg = wvc.config.Configure.Vectors.self_provided()
+    vector_cfg = wvc.config.Configure.Vectors.self_provided(
+        vector_index_config=vector_index_config
+    )
     client.collections.create(
     name=WEAVIATE_CLASS,
     properties=properties,
@@ -313,8 +388,10 @@ def write_to_vector_db(chunks_with_embeddings: List[Dict[str, Any]]) -> None:
         # 1. Connect and ensure schema
         with _connect_weaviate() as client:
             # Optional; be careful in production
+            # Build the index config before deleting anything
+            vector_index_config = _vector_index_config()
             client.collections.delete_all() #WARNING!!!! 
-            _ensure_weaviate_schema(client)
+            _ensure_weaviate_schema(client, vector_index_config)
             logger.info("Weaviate client and schema ensured")
 
             # 2. Get the collection
@@ -363,6 +440,15 @@ def write_to_vector_db(chunks_with_embeddings: List[Dict[str, Any]]) -> None:
                     WEAVIATE_CLASS,
                 )
 
+            # 5. Compress the index now that there is data to train on
+            if VECTOR_QUANTIZATION != "none":
+                try:
+                    if VECTOR_QUANTIZATION in ("pq", "sq"):
+                        _enable_trained_quantizer(collection)
+                    _log_compression_status(client)
+                except Exception as e:
+                    logger.warning("Vector quantization failed; index left uncompressed: %s", e)
+
     except Exception as e:
         logger.error("Failed to write chunks to Weaviate: %s", e)
 
@@ -1,8 +1,12 @@
 import asyncio
 import os
 import json
+import time
+import uuid
+from functools import lru_cache
+from collections import OrderedDict
 from contextlib import AsyncExitStack, asynccontextmanager
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from mcp import ClientSession
 from mcp.client.sse import sse_client
@@ -12,12 +16,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, HumanMessage
+
+import tiktoken
 
 OPENAI_LLM = os.getenv("OPENAI_LLM", "gpt-4.1")
 MCP_SERVER_PORT = os.getenv("MCP_SERVER_PORT")
 MCP_SERVER_SSE_URL = "http://localhost:" + MCP_SERVER_PORT + "/sse" #change this accordingly  
 
+# Conversation memory
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+CONDENSE_TIMEOUT_SECONDS = float(os.getenv("CONDENSE_TIMEOUT_SECONDS", "10"))
+
 # ------------------------------------------------------------
 # Connect to MCP Server 
 # ------------------------------------------------------------
@@ -71,6 +85,155 @@ async def call_mcp_retrieval(session: ClientSession, query: str, top_k: int = 5)
     text = result.content[0].text
     return json.loads(text)["top_chunks"]
 
+# ------------------------------------------------------------
+# Conversation Memory
+# ------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    Loaded lazily: tiktoken downloads its BPE file on first use, which must not
+    keep the service from starting (e.g. in an offline container).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(OPENAI_LLM)
+        except KeyError:
+            # Unknown/new model names fall back to the current OpenAI encoding
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable ({e}); estimating tokens from characters")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        # Roughly 4 characters per token for English text
+        return (len(text or "") + 3) // 4
+    return len(encoding.encode(text or ""))
+
+
+class ConversationStore:
+    """
+    In-memory, session-keyed chat history.
+
+    Bounded in two ways: at most SESSION_MAX_COUNT sessions are kept (least
+    recently used is evicted first) and sessions idle for longer than
+    SESSION_TTL_SECONDS are dropped. Each session keeps at most
+    SESSION_MAX_TURNS question/answer pairs (0 disables memory).
+
+    Clearing a session records when it happened, so a request that read the
+    history before the clear does not bring the session back on append.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: int, max_turns: int):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        # session_id -> (last_access, [{"role": ..., "content": ...}, ...])
+        self._sessions: "OrderedDict[str, tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+        # session_id -> time of the last clear
+        self._cleared: "OrderedDict[str, float]" = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest entries sit at the front, so stop at the first fresh one
+        while self._sessions:
+            sid, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._sessions.pop(sid)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        # Clear markers only matter for requests still in flight
+        while self._cleared:
+            sid, cleared_at = next(iter(self._cleared.items()))
+            if now - cleared_at <= self.ttl_seconds and len(self._cleared) <= self.max_sessions:
+                break
+            self._cleared.pop(sid)
+
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        self._evict()
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return []
+        self._sessions.move_to_end(session_id)
+        self._sessions[session_id] = (time.monotonic(), entry[1])
+        return list(entry[1])
+
+    def append(self, session_id: str, query: str, answer: str, started: float):
+        """
+        Record a turn for a request that read the history at `started`
+        (time.monotonic()). Skipped if the session was cleared since then.
+        """
+        if self.max_turns <= 0:
+            return
+        if self._cleared.get(session_id, float("-inf")) >= started:
+            return
+        _, history = self._sessions.pop(session_id, (None, []))
+        history.append({"role": "user", "content": query})
+        history.append({"role": "assistant", "content": answer})
+        history = history[-2 * self.max_turns:]
+        self._sessions[session_id] = (time.monotonic(), history)
+        self._evict()
+
+    def clear(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._cleared.pop(session_id, None)
+        self._cleared[session_id] = time.monotonic()
+        self._evict()
+
+
+def trim_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """
+    Keep the most recent messages whose combined token count fits the budget.
+    """
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for msg in reversed(history):
+        cost = count_tokens(msg["content"])
+        if used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+    # Never start the window with a dangling assistant reply
+    if kept and kept[0]["role"] == "assistant":
+        kept = kept[1:]
+    return kept
+
+
+def to_messages(history: List[Dict[str, str]]):
+    return [
+        HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+        for m in history
+    ]
+
+
+async def condense_query(query: str, history: List[Dict[str, str]]) -> str:
+    """
+    Rewrite a follow-up question into a standalone query for retrieval.
+    """
+    if not history:
+        return query
+
+    llm = ChatOpenAI(model=OPENAI_LLM, temperature=0)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "Given the conversation so far and a follow-up question, rewrite the "
+         "follow-up as a standalone search query that can be understood without "
+         "the conversation. Return ONLY the rewritten query."),
+        MessagesPlaceholder("history"),
+        ("human", "Follow-up question:\n{query}")
+    ])
+
+    chain = prompt | llm
+
+    resp = await chain.ainvoke({"query": query, "history": to_messages(history)})
+    return resp.content.strip() or query
+
 # ------------------------------------------------------------
 # Build Context for RAG
 # ------------------------------------------------------------
@@ -94,7 +257,7 @@ def build_context(chunks: List[Dict[str, Any]]) -> str:
 # LLM RAG Generation
 # ------------------------------------------------------------
 
-async def run_rag(query: str, chunks: List[Dict[str, Any]]) -> str:
+async def run_rag(query: str, chunks: List[Dict[str, Any]], history: Optional[List[Dict[str, str]]] = None) -> str:
 
     context = build_context(chunks)
     # print('>>>>>>>>>>>>>This is the context\n',context, '\n' )
@@ -104,13 +267,18 @@ async def run_rag(query: str, chunks: List[Dict[str, Any]]) -> str:
         ("system",
          "You are a helpful assistant. Use ONLY the provided context. "
          "If unsure, say you don't know."),
+        MessagesPlaceholder("history"),
         ("human",
          "Query:\n{query}\n\nContext:\n{context}\n\nAnswer:")
     ])
 
     chain = prompt | llm
 
-    resp = await chain.ainvoke({"query": query, "context": context})
+    resp = await chain.ainvoke({
+        "query": query,
+        "context": context,
+        "history": to_messages(history or []),
+    })
     return resp.content
 
 # -----------------------------
@@ -118,6 +286,7 @@ async def run_rag(query: str, chunks: List[Dict[str, Any]]) -> str:
 # -----------------------------
 
 mcp_rag_client = MCPRAGClient()
+conversation_store = ConversationStore(SESSION_MAX_COUNT, SESSION_TTL_SECONDS, SESSION_MAX_TURNS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -140,12 +309,35 @@ app.add_middleware(
 class QueryRequest(BaseModel):
     query: str
     top_k: int
+    session_id: Optional[str] = None
 
 @app.post("/rag_query")
 async def rag_query(body: QueryRequest):
     try:
-        chunks = await call_mcp_retrieval(mcp_rag_client.session, body.query, body.top_k)
-        answer = await run_rag(body.query, chunks)
-        return {"answer": answer, "chunks_used": len(chunks)}
+        session_id = body.session_id or str(uuid.uuid4())
+        started = time.monotonic()
+        history = trim_history(conversation_store.get(session_id), HISTORY_TOKEN_BUDGET)
+        try:
+            search_query = await asyncio.wait_for(
+                condense_query(body.query, history), timeout=CONDENSE_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            # Memory is best-effort: retrieve with the raw query rather than fail the request
+            print(f"Query condensation failed ({e!r}); using the original query")
+            search_query = body.query
+        chunks = await call_mcp_retrieval(mcp_rag_client.session, search_query, body.top_k)
+        answer = await run_rag(body.query, chunks, history)
+        conversation_store.append(session_id, body.query, answer, started)
+        return {
+            "answer": answer,
+            "chunks_used": len(chunks),
+            "session_id": session_id,
+            "search_query": search_query,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/session/{session_id}")
+async def clear_session(session_id: str):
+    conversation_store.clear(session_id)
+    return {"session_id": session_id, "cleared": True}
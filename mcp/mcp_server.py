@@ -1,8 +1,8 @@
 import os
+import math
 import typing as t
 # import time
 # import json
-from urllib.parse import urlparse
 
 # FastMCP
 from mcp.server.fastmcp import FastMCP
@@ -11,78 +11,82 @@ from mcp.server.fastmcp import FastMCP
 from langchain_openai import OpenAIEmbeddings
 
 # Weaviate client v4
-import weaviate
 # from weaviate.classes.init import Auth
 import weaviate.classes as wvc
 
+# Weaviate connection and index storage settings shared with ingestion
+from vector_storage import (
+    get_weaviate_client,
+    EMBEDDING_DIMENSIONS,
+    WEAVIATE_CLASS,
+    VECTOR_QUANTIZATION,
+    RESCORE_MULTIPLIER,
+)
+
 # ---------- Config ----------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("Please set OPENAI_API_KEY in the environment")
 
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL")
-WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://weaviate:8000")
-WEAVIATE_GRPC_PORT = os.getenv("WEAVIATE_GRPC_PORT", 50051)
-WEAVIATE_CLASS = os.getenv("WEAVIATE_CLASS", "DocumentChunk")
 MCP_AUTH_TOKEN = os.getenv("MCP_AUTH_TOKEN", "supersecrettoken")
 MCP_SERVER_PORT = os.getenv("MCP_SERVER_PORT", 8050)
 
-# ----------------------------
-# 1. Connect to Weaviate (v4)
-# ----------------------------
-
-def get_weaviate_client():
-    """
-    Parses the URL and connects using Weaviate v4 syntax.
-    """
-    parsed = urlparse(WEAVIATE_URL)
-    host = parsed.hostname
-    port = parsed.port
-    # The standard gRPC port for Weaviate is 50051
-    # GRPC_PORT = 50051    
-    print(f"Connecting to Weaviate at HTTP:{host}:{port} and gRPC:{host}:{WEAVIATE_GRPC_PORT}...")
-    # Use connect_to_custom to handle docker container hostnames
-    client = weaviate.connect_to_custom(
-        http_host=host,
-        http_port=port,
-        http_secure=(parsed.scheme == "https"),
-        grpc_host=host,
-        grpc_port=WEAVIATE_GRPC_PORT,
-        grpc_secure=(parsed.scheme == "https"),
-        # headers={
-        #     "X-OpenAI-Api-Key": OPENAI_API_KEY  # Optional: if you want Weaviate to do vectorization directly later
-        # }
-    )
-    assert client.is_ready()
-    print("Weaviate connected and ready.")
-    return client
-
 # ---------- LangChain embeddings & vectorstore adapter ----------
 
 # ----------------------------
-# 2. Embed the query
+# 1. Embed the query
 # ----------------------------
 
 def embed_query(query: str) -> list[float]:
     embedder = OpenAIEmbeddings(
         model=OPENAI_EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
         api_key=OPENAI_API_KEY)
     # embed_query returns 1 vector
     return embedder.embed_query(query)
 
 # ----------------------------
-# 3. Vector Search (Top k)
+# 2. Vector Search (Top k)
 # ----------------------------
 
+def cosine_distance(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return 1.0 - dot / norm if norm else 1.0
+
+def rescore(query_vector: list[float], objects: list, top_k: int) -> list:
+    """
+    Re-rank candidates from a quantized index by exact cosine distance to
+    their full-precision vectors, overwriting the approximate distance.
+    Candidates returned without a vector keep their approximate distance and
+    are ranked after all rescored ones, so the two scales are never mixed.
+    """
+    rescored, unscored = [], []
+    for obj in objects:
+        vector = obj.vector
+        if isinstance(vector, dict):
+            vector = vector.get("default")
+        if vector:
+            obj.metadata.distance = cosine_distance(query_vector, vector)
+            rescored.append(obj)
+        else:
+            unscored.append(obj)
+    rescored.sort(key=lambda o: o.metadata.distance)
+    return (rescored + unscored)[:top_k]
+
 def query_chunks(query: str, top_k: int):
     client = get_weaviate_client()
     query_vector = embed_query(query)
 
     collection = client.collections.use(WEAVIATE_CLASS)
 
+    rescoring = VECTOR_QUANTIZATION != "none" and RESCORE_MULTIPLIER > 1
+
     result = collection.query.near_vector(
         near_vector=query_vector,
-        limit=top_k,
+        limit=top_k * RESCORE_MULTIPLIER if rescoring else top_k,
+        include_vector=rescoring,
         return_metadata=wvc.query.MetadataQuery(
             distance=True
         ),
@@ -96,6 +100,8 @@ def query_chunks(query: str, top_k: int):
     )
 
     client.close()
+    if rescoring:
+        return rescore(query_vector, result.objects, top_k)
     return result.objects  # a list of Weaviate objects
 
 
@@ -0,0 +1,93 @@
+import os
+from urllib.parse import urlparse
+
+# Weaviate client v4
+import weaviate
+
+# ---------- Config ----------
+# Shared by the ingestion service, the MCP server and the benchmark, so the
+# index that is built and the index that is queried always agree.
+
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://weaviate:8000")
+WEAVIATE_GRPC_PORT = os.getenv("WEAVIATE_GRPC_PORT", 50051)
+WEAVIATE_CLASS = os.getenv("WEAVIATE_CLASS", "DocumentChunk")
+
+# Truncated (Matryoshka) embedding size; empty = model default
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+
+# Index compression: none | pq | bq | sq (blank = none)
+VECTOR_QUANTIZATION_OPTIONS = ("none", "pq", "bq", "sq")
+VECTOR_QUANTIZATION = (os.getenv("VECTOR_QUANTIZATION") or "none").strip().lower()
+if VECTOR_QUANTIZATION not in VECTOR_QUANTIZATION_OPTIONS:
+    raise ValueError(
+        f"Unsupported VECTOR_QUANTIZATION: {VECTOR_QUANTIZATION!r} "
+        f"(expected one of {', '.join(VECTOR_QUANTIZATION_OPTIONS)})"
+    )
+
+# Empty = Weaviate's defaults (see below)
+PQ_SEGMENTS = int(os.getenv("PQ_SEGMENTS") or 0) or None
+QUANTIZATION_TRAINING_LIMIT = int(os.getenv("QUANTIZATION_TRAINING_LIMIT") or 0) or None
+QUANTIZATION_RESCORE_LIMIT = int(os.getenv("QUANTIZATION_RESCORE_LIMIT") or 0) or None
+
+# When the index is quantized, fetch top_k * RESCORE_MULTIPLIER candidates and
+# re-rank them with their full-precision vectors
+RESCORE_MULTIPLIER = int(os.getenv("RESCORE_MULTIPLIER", "4"))
+
+# Weaviate's own defaults when PQ_SEGMENTS / QUANTIZATION_TRAINING_LIMIT are unset
+WEAVIATE_DEFAULT_TRAINING_LIMIT = 100000
+PQ_CENTROIDS = 256  # one byte per segment code
+
+
+def default_pq_segments(dims: int) -> int:
+    """
+    Segment count Weaviate picks when `segments` is not configured.
+    """
+    if dims >= 2048 and dims % 8 == 0:
+        return dims // 8
+    if dims >= 768 and dims % 6 == 0:
+        return dims // 6
+    if dims >= 256 and dims % 4 == 0:
+        return dims // 4
+    if dims % 2 == 0:
+        return dims // 2
+    return dims
+
+
+def pq_segments(dims: int) -> int:
+    if PQ_SEGMENTS and dims % PQ_SEGMENTS == 0:
+        return PQ_SEGMENTS
+    return default_pq_segments(dims)
+
+
+def pq_training_limit() -> int:
+    return QUANTIZATION_TRAINING_LIMIT or WEAVIATE_DEFAULT_TRAINING_LIMIT
+
+# ----------------------------
+# Connect to Weaviate (v4)
+# ----------------------------
+
+def get_weaviate_client():
+    """
+    Parses the URL and connects using Weaviate v4 syntax.
+    """
+    parsed = urlparse(WEAVIATE_URL)
+    host = parsed.hostname
+    port = parsed.port
+    # The standard gRPC port for Weaviate is 50051
+    # GRPC_PORT = 50051
+    print(f"Connecting to Weaviate at HTTP:{host}:{port} and gRPC:{host}:{WEAVIATE_GRPC_PORT}...")
+    # Use connect_to_custom to handle docker container hostnames
+    client = weaviate.connect_to_custom(
+        http_host=host,
+        http_port=port,
+        http_secure=(parsed.scheme == "https"),
+        grpc_host=host,
+        grpc_port=WEAVIATE_GRPC_PORT,
+        grpc_secure=(parsed.scheme == "https"),
+        # headers={
+        #     "X-OpenAI-Api-Key": OPENAI_API_KEY  # Optional: if you want Weaviate to do vectorization directly later
+        # }
+    )
+    assert client.is_ready()
+    print("Weaviate connected and ready.")
+    return client
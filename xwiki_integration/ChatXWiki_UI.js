@@ -5,6 +5,8 @@
     const POSITION_KEY = "xwiki_chat_position";
     const MINIMIZED_KEY = "xwiki_chat_minimized";
     const SIZE_KEY = "xwiki_chat_size";
+    const SESSION_KEY = "xwiki_chat_session";
+    const RAG_API_URL = "http://localhost:9100";
 
     // Create the floating container
     const chatContainer = document.createElement("div");
@@ -372,12 +374,27 @@
         localStorage.setItem(STORAGE_KEY, JSON.stringify(history));
     }
 
+    function getSessionId() {
+        let sessionId = localStorage.getItem(SESSION_KEY);
+        if (!sessionId) {
+            sessionId = (window.crypto && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : Date.now().toString(36) + Math.random().toString(36).slice(2);
+            localStorage.setItem(SESSION_KEY, sessionId);
+        }
+        return sessionId;
+    }
+
     loadChatHistory();
 
     // -------------------- CLEAR CHAT BUTTON --------------------
     const clearBtn = document.getElementById("chatbox-clear");
     clearBtn.onclick = function () {
         localStorage.removeItem(STORAGE_KEY);
+        // Drop the server-side conversation memory as well and start a new session
+        fetch(RAG_API_URL + "/session/" + encodeURIComponent(getSessionId()), { method: "DELETE" })
+            .catch(() => {});
+        localStorage.removeItem(SESSION_KEY);
         messagesBox.innerHTML = "";
         appendMessage("🧹 Chat cleared.", "bot");
     };
@@ -399,13 +416,14 @@
         appendMessage("Thinking...", "bot");
 
         try {
-            const response = await fetch("http://localhost:9100/rag_query", {
+            const response = await fetch(RAG_API_URL + "/rag_query", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ query: query, top_k: 3 })
+                body: JSON.stringify({ query: query, top_k: 3, session_id: getSessionId() })
             });
 
             const data = await response.json();
+            if (data.session_id) localStorage.setItem(SESSION_KEY, data.session_id);
 
             messagesBox.lastChild.remove();
             appendMessage(data.answer, "bot");